@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU General Public
+License as published by the Free Software Foundation, version 2 of the License (GPLv2).
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details at http://www.gnu.org/licenses/.
+
+name: ensembl_id_db.py
+date: Oct-18-2026
+version: 1.0
+author: Stephen R. Bond
+email: steve.bond@nih.gov
+institute: Computational and Statistical Genomics Branch, Division of Intramural Research,
+           National Human Genome Research Institute, National Institutes of Health
+           Bethesda, MD
+repository: https://github.com/biologyguy/public_scripts
+© license: Gnu General Public License, Version 2.0 (http://www.gnu.org/licenses/gpl.html)
+derivative work: No
+
+Description:
+Load the output of ensembl_scraper.py into an indexed SQLite database, so that questions like 'which species have hits
+for this query?' or 'is this ID already known?' become indexed lookups instead of re-scraping or grepping text dumps.
+Each imported file is stored under a query name (the search term, by default the file name), and the IDs or species of
+several queries can be combined with union, intersect and difference. For a detailed description of the parameters the
+script takes, navigate to the directory containing the program within a terminal window, and run the following command:
+
+    python ./ensembl_id_db.py -h
+"""
+
+import argparse
+import os
+from sys import exit
+
+import ensembl_scraper
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS queries (query_id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS hits (query_id INTEGER NOT NULL REFERENCES queries(query_id),
+                                 species TEXT NOT NULL,
+                                 gene_id TEXT NOT NULL,
+                                 UNIQUE (query_id, species, gene_id));
+CREATE INDEX IF NOT EXISTS hits_species ON hits (species);
+CREATE INDEX IF NOT EXISTS hits_gene_id ON hits (gene_id);
+"""
+
+SET_OPERATIONS = {"union": "UNION", "intersect": "INTERSECT", "difference": "EXCEPT"}
+
+
+def connect(db_path):
+    import sqlite3
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def import_ids(conn, query, ids):
+    with conn:
+        conn.execute("INSERT OR IGNORE INTO queries (name) VALUES (?)", (query,))
+        query_id = conn.execute("SELECT query_id FROM queries WHERE name = ?", (query,)).fetchone()[0]
+        rows = ((query_id, species, gene_id) for species in ids for gene_id in ids[species])
+        cursor = conn.executemany("INSERT OR IGNORE INTO hits (query_id, species, gene_id) VALUES (?, ?, ?)", rows)
+    return cursor.rowcount
+
+
+def export_ids(conn, queries=None):
+    sql = "SELECT DISTINCT species, gene_id FROM hits JOIN queries USING (query_id)"
+    params = ()
+    if queries:
+        sql += " WHERE name IN (%s)" % ",".join("?" * len(queries))
+        params = tuple(queries)
+    sql += " ORDER BY species, gene_id"
+    ids = {}
+    for species, gene_id in conn.execute(sql, params):
+        ids.setdefault(species, []).append(gene_id)
+    return ids
+
+
+def list_queries(conn):
+    return [row[0] for row in conn.execute("SELECT name FROM queries ORDER BY name")]
+
+
+def species_for_query(conn, query):
+    sql = "SELECT species, COUNT(DISTINCT gene_id) FROM hits JOIN queries USING (query_id) WHERE name = ? " \
+          "GROUP BY species ORDER BY species"
+    return conn.execute(sql, (query,)).fetchall()
+
+
+def lookup_id(conn, gene_id):
+    sql = "SELECT species, name FROM hits JOIN queries USING (query_id) WHERE gene_id = ? ORDER BY species, name"
+    return conn.execute(sql, (gene_id,)).fetchall()
+
+
+def set_operation(conn, operation, queries, column="gene_id"):
+    if operation not in SET_OPERATIONS:
+        raise ValueError("Unknown set operation '%s'" % operation)
+    if column not in ["gene_id", "species"]:
+        raise ValueError("Unknown column '%s'" % column)
+    select = "SELECT DISTINCT %s FROM hits JOIN queries USING (query_id) WHERE name = ?" % column
+    sql = (" %s " % SET_OPERATIONS[operation]).join([select] * len(queries))
+    return sorted(row[0] for row in conn.execute(sql, tuple(queries)))
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="ensembl_id_db",
+                                     description="Indexed local store for the IDs returned by ensembl_scraper")
+    parser.add_argument('-d', '--database', help='Location of the SQLite database',
+                        action="store", default="%s/ensembl_ids.db" % os.getcwd())
+    subparsers = parser.add_subparsers(dest="command")
+
+    import_parser = subparsers.add_parser("import", help="Load ensembl_scraper output files")
+    import_parser.add_argument('infiles', help='ensembl_scraper output file(s)', nargs="+")
+    import_parser.add_argument('-q', '--query', help='Name to store the IDs under (defaults to the file name)',
+                               action="store")
+
+    export_parser = subparsers.add_parser("export", help="Write IDs back out in ensembl_scraper format")
+    export_parser.add_argument('-q', '--queries', help='Only export these queries', nargs="+")
+    export_parser.add_argument('-o', '--outfile', help='Send the results to a file, instead of StdOut',
+                               action="store")
+
+    subparsers.add_parser("queries", help="List the stored queries")
+
+    species_parser = subparsers.add_parser("species", help="Which species have hits for a query?")
+    species_parser.add_argument('query', help='Query name')
+
+    lookup_parser = subparsers.add_parser("lookup", help="Is this gene ID already known?")
+    lookup_parser.add_argument('gene_ids', help='Gene ID(s) to look up', nargs="+")
+
+    setop_parser = subparsers.add_parser("setop", help="Combine the hits of several queries")
+    setop_parser.add_argument('operation', choices=sorted(SET_OPERATIONS))
+    setop_parser.add_argument('queries', help='Query names, applied left to right', nargs="+")
+    setop_parser.add_argument('-s', '--species', help='Compare species instead of gene IDs', action="store_true")
+
+    in_args = parser.parse_args()
+    if not in_args.command:
+        parser.print_help()
+        return
+
+    connection = connect(in_args.database)
+
+    if in_args.command == "import":
+        for infile in in_args.infiles:
+            query_name = in_args.query if in_args.query else os.path.splitext(os.path.basename(infile))[0]
+            with open(infile, "r") as ifile:
+                new_rows = import_ids(connection, query_name, ensembl_scraper.parse_output(ifile))
+            print("%s new IDs imported from %s as '%s'" % (new_rows, infile, query_name))
+
+    elif in_args.command == "export":
+        output = ensembl_scraper.format_output(export_ids(connection, in_args.queries))
+        if in_args.outfile:
+            outfile = os.path.abspath(in_args.outfile)
+            with open(outfile, "w") as ofile:
+                ofile.write(output)
+            print("Output written to %s" % outfile)
+        else:
+            print(output)
+
+    elif in_args.command == "queries":
+        for name in list_queries(connection):
+            print(name)
+
+    elif in_args.command == "species":
+        hits = species_for_query(connection, in_args.query)
+        if not hits:
+            exit("No records found for query '%s'" % in_args.query)
+        for species, count in hits:
+            print("%s\t%s" % (species, count))
+
+    elif in_args.command == "lookup":
+        for gene_id in in_args.gene_ids:
+            hits = lookup_id(connection, gene_id)
+            if not hits:
+                print("%s\tnot found" % gene_id)
+            for species, name in hits:
+                print("%s\t%s\t%s" % (gene_id, species, name))
+
+    elif in_args.command == "setop":
+        column = "species" if in_args.species else "gene_id"
+        for value in set_operation(connection, in_args.operation, in_args.queries, column):
+            print(value)
+
+    connection.close()
+
+
+if __name__ == '__main__':
+    main()
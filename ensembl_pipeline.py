@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU General Public
+License as published by the Free Software Foundation, version 2 of the License (GPLv2).
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details at http://www.gnu.org/licenses/.
+
+name: ensembl_pipeline.py
+date: Oct-18-2026
+version: 1.0
+author: Stephen R. Bond
+email: steve.bond@nih.gov
+institute: Computational and Statistical Genomics Branch, Division of Intramural Research,
+           National Human Genome Research Institute, National Institutes of Health
+           Bethesda, MD
+repository: https://github.com/biologyguy/public_scripts
+© license: Gnu General Public License, Version 2.0 (http://www.gnu.org/licenses/gpl.html)
+derivative work: No
+
+Description:
+Chain ensembl_scraper.py, Ensembl REST sequence retrieval, ps_scan_py3.py and siRNA_predict.py into a single streaming
+pipeline. Each stage runs concurrently and hands its results to the next stage through a queue (bounded for the
+sequences), so proteins are being scanned and cDNAs scored while the search is still returning IDs. All results are
+written to one output directory, along with the IDs found (in ensembl_scraper format) and the throughput of every
+stage. The Ensembl and PROSITE servers can be changed, so the whole pipeline can be run against local stub services.
+For a detailed description of the parameters the script takes, navigate to the directory containing the program within
+a terminal window, and run the following command:
+
+    python ./ensembl_pipeline.py -h
+"""
+
+# asyncio and requests are imported inside the functions that use them, so that --help and library imports stay fast
+import argparse
+import os
+import sys
+import threading
+import time
+
+import ensembl_scraper
+import ps_scan_py3
+import siRNA_predict
+
+# Ensembl REST accepts at most 50 IDs per POST /sequence/id request
+SEQUENCE_BATCH = 50
+
+
+class StageStats(object):
+    # The clock starts when a stage gets its first item and stops when it finishes its last one. worker_time is summed
+    # over all of a stage's workers, so it can exceed the wall time of a stage with several workers.
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.worker_time = 0.
+        self.start = None
+        self.end = None
+
+    def started(self):
+        if self.start is None:
+            self.start = time.perf_counter()
+
+    def finished(self):
+        self.end = time.perf_counter()
+
+    def wall(self):
+        if self.start is None:
+            return 0.
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def throughput(self):
+        wall = self.wall()
+        return self.items / wall if wall else 0.
+
+    def __str__(self):
+        return "%s\t%s\t%.2f\t%.2f\t%.2f" % (self.name, self.items, self.wall(), self.worker_time, self.throughput())
+
+
+def fetch_sequences(session, server, gene_ids, seq_type):
+    # multiple_sequences returns every transcript/translation of a gene, with the gene ID in 'query'
+    response = ensembl_scraper.rest_request(session, "POST", "%s/sequence/id" % server,
+                                            params={"type": seq_type, "multiple_sequences": 1},
+                                            json={"ids": gene_ids})
+    response.raise_for_status()
+    return response.json()
+
+
+async def run_ps_scan(email, title, sequence, outfile, outformat, scan_server, poll_interval):
+    import asyncio
+
+    # Only the individual requests run in threads. The job is polled from the event loop, so waiting on a long job
+    # neither holds a thread nor keeps the pipeline from being cancelled.
+    job_id = await asyncio.to_thread(ps_scan_py3.service_run, email, title,
+                                     {'sequence': ">%s\n%s" % (title, sequence)}, scan_server)
+    while True:
+        status = await asyncio.to_thread(ps_scan_py3.service_get_status, job_id, scan_server)
+        if status.decode("utf-8") not in ["RUNNING", "PENDING"]:
+            break
+        await asyncio.sleep(poll_interval)
+    await asyncio.to_thread(ps_scan_py3.get_result, job_id, outfile, outformat, scan_server, False)
+    return job_id
+
+
+def score_cdna(sequence, outfile):
+    si_seqs_list = siRNA_predict.score_sequence(siRNA_predict.clean_sequence(sequence))
+    with open(outfile, "w") as ofile:
+        ofile.write(siRNA_predict.format_output(si_seqs_list, csv=True))
+
+
+async def scrape_stage(backend, search_term, server, species_filter, id_queues, stats, outfile, stop):
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    ids = {}
+
+    # The backends are blocking generators, so run them in a thread and hand each hit to every fetch queue as it
+    # arrives. The ID queues are unbounded, so the scraper never waits on the fetch stages; the stop event ends the
+    # search early once the pipeline is shutting down.
+    def produce():
+        for species, gene_id in backend(search_term, server, species_filter, progress=False):
+            if stop.is_set():
+                return
+            ids.setdefault(species, []).append(gene_id)
+            stats.items += 1
+            for id_queue in id_queues:
+                loop.call_soon_threadsafe(id_queue.put_nowait, (species, gene_id))
+
+    stats.started()
+    try:
+        await asyncio.to_thread(produce)
+    finally:
+        stats.finished()
+        stats.worker_time = stats.wall()
+
+    # The end-of-stream markers are only sent on success; on failure every stage is cancelled instead
+    for id_queue in id_queues:
+        await id_queue.put(None)
+
+    with open(outfile, "w") as ofile:
+        ofile.write(ensembl_scraper.format_output(ids))
+    return ids
+
+
+async def fetch_stage(session, server, seq_type, id_queue, out_queue, consumers, stats, batch_size=SEQUENCE_BATCH):
+    import asyncio
+
+    finished = False
+    while not finished:
+        item = await id_queue.get()
+        if item is None:
+            break
+        stats.started()
+        # Take whatever else is already waiting, rather than holding up the batch for more IDs
+        batch = [item]
+        while len(batch) < batch_size and not id_queue.empty():
+            item = id_queue.get_nowait()
+            if item is None:
+                finished = True
+                break
+            batch.append(item)
+
+        # The same gene ID can be returned for more than one species
+        species_map = {}
+        for species, gene_id in batch:
+            species_map.setdefault(gene_id, []).append(species)
+
+        start = time.perf_counter()
+        records = await asyncio.to_thread(fetch_sequences, session, server, list(species_map), seq_type)
+        stats.worker_time += time.perf_counter() - start
+        for record in records:
+            stats.items += 1
+            await out_queue.put((species_map.get(record["query"], []), record["query"], record["id"], record["seq"]))
+        stats.finished()
+
+    for _ in range(consumers):
+        await out_queue.put(None)
+
+
+async def scan_worker(protein_queue, email, outdir, outformat, scan_server, poll_interval, stats):
+    while True:
+        item = await protein_queue.get()
+        if item is None:
+            break
+        stats.started()
+        species, gene_id, seq_id, sequence = item
+        start = time.perf_counter()
+        await run_ps_scan(email, seq_id, sequence, os.path.join(outdir, seq_id), outformat, scan_server, poll_interval)
+        stats.worker_time += time.perf_counter() - start
+        stats.items += 1
+        stats.finished()
+
+
+async def score_worker(cdna_queue, outdir, stats):
+    import asyncio
+
+    while True:
+        item = await cdna_queue.get()
+        if item is None:
+            break
+        stats.started()
+        species, gene_id, seq_id, sequence = item
+        start = time.perf_counter()
+        await asyncio.to_thread(score_cdna, sequence, os.path.join(outdir, "%s.siRNA.csv" % seq_id))
+        stats.worker_time += time.perf_counter() - start
+        stats.items += 1
+        stats.finished()
+
+
+async def run_pipeline(search_term, outdir, backend="rest", server=None, rest_server=ensembl_scraper.REST_SERVER,
+                       species_filter=None, email=None, scan=True, score=True, queue_size=100, scan_workers=4,
+                       score_workers=1, outformat=None, scan_server=ps_scan_py3.baseUrl,
+                       poll_interval=ps_scan_py3.checkInterval):
+    import asyncio
+    import requests
+
+    if scan and not email:
+        raise ValueError("An email address is required to submit PROSITE scan jobs")
+    backend, default_server = ensembl_scraper.BACKENDS[backend]
+    server = server.rstrip("/") if server else default_server
+    rest_server = rest_server.rstrip("/")
+    scan_server = scan_server.rstrip("/")
+    os.makedirs(outdir, exist_ok=True)
+
+    # Proteins and cDNAs are fetched by separate stages, so a backlog of slow PROSITE jobs can't starve siRNA scoring.
+    # The ID queues are left unbounded for the same reason (a full protein ID queue would hold up the scraper, and so
+    # the cDNAs too); the sequences are what need bounding, and their queues stay limited to queue_size.
+    stats = [StageStats("scrape")]
+    id_queues = []
+    sessions = []
+    stages = []
+    stop = threading.Event()
+    for seq_type, enabled, consumers in [("protein", scan, scan_workers), ("cdna", score, score_workers)]:
+        if not enabled:
+            continue
+        id_queue = asyncio.Queue()
+        out_queue = asyncio.Queue(queue_size)
+        session = requests.Session()
+        session.headers.update({"Content-Type": "application/json", "Accept": "application/json"})
+        fetch_stats = StageStats("fetch_%s" % seq_type)
+        id_queues.append(id_queue)
+        sessions.append(session)
+        stats.append(fetch_stats)
+        stages.append(fetch_stage(session, rest_server, seq_type, id_queue, out_queue, consumers, fetch_stats))
+        if seq_type == "protein":
+            worker_stats = StageStats("scan")
+            stages += [scan_worker(out_queue, email, outdir, outformat, scan_server, poll_interval, worker_stats)
+                       for _ in range(consumers)]
+        else:
+            worker_stats = StageStats("score")
+            stages += [score_worker(out_queue, outdir, worker_stats) for _ in range(consumers)]
+        stats.append(worker_stats)
+    stages.insert(0, scrape_stage(backend, search_term, server, species_filter, id_queues, stats[0],
+                                  os.path.join(outdir, "ensemble_ids.txt"), stop))
+
+    # Stop everything as soon as any stage fails, otherwise the others wait forever on queues that nobody serves
+    tasks = [asyncio.ensure_future(stage) for stage in stages]
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    finally:
+        stop.set()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for session in sessions:
+            session.close()
+
+    for task in tasks:
+        if task.done() and not task.cancelled() and task.exception() is not None:
+            raise task.exception()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="ensembl_pipeline",
+                                     description="Search Ensembl, fetch the sequences of every hit, scan the proteins "
+                                                 "for PROSITE motifs and score the cDNAs for siRNA targets",
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('search_term', help='What would you like to search for?', action='store')
+    parser.add_argument('-o', '--outdir', help='Directory for all of the results',
+                        action="store", default="%s/pipeline_output" % os.getcwd())
+    parser.add_argument('-e', '--email', help='e-mail address for PROSITE scan jobs', action="store")
+    parser.add_argument('-b', '--backend', help='Scrape the html search pages, or query the JSON REST API',
+                        choices=sorted(ensembl_scraper.BACKENDS), default="rest")
+    parser.add_argument('-s', '--server', help='Base url of the Ensembl search server (defaults depend on backend)',
+                        action="store")
+    parser.add_argument('-sp', '--species', help='Restrict the search to these species', nargs="+", action="store")
+    parser.add_argument('-r', '--rest_server', help='Base url of the Ensembl REST server used to fetch sequences',
+                        action="store", default=ensembl_scraper.REST_SERVER)
+    parser.add_argument('-ps', '--scan_server', help='Base url of the PROSITE scan REST service',
+                        action="store", default=ps_scan_py3.baseUrl)
+    parser.add_argument('-f', '--outformat', help='PROSITE scan result type to keep (all types if not set)',
+                        action="store")
+    parser.add_argument('-ns', '--no_scan', help='Do not scan the proteins for motifs', action="store_true")
+    parser.add_argument('-nr', '--no_sirna', help='Do not score the cDNAs for siRNA targets', action="store_true")
+    parser.add_argument('-q', '--queue_size', help='Maximum number of sequences waiting to be scanned or scored',
+                        type=int, default=100)
+    parser.add_argument('-w', '--scan_workers', help='Number of PROSITE scan jobs to run at once', type=int, default=4)
+    parser.add_argument('-p', '--poll_interval', help='Seconds between PROSITE scan job status checks',
+                        type=float, default=ps_scan_py3.checkInterval)
+
+    in_args = parser.parse_args()
+
+    if not in_args.no_scan and not in_args.email:
+        parser.error("You must include an email address to scan proteins (or turn scanning off with --no_scan)")
+
+    import asyncio
+    import requests
+    import urllib.error
+
+    start_time = time.perf_counter()
+    try:
+        stage_stats = asyncio.run(run_pipeline(in_args.search_term, in_args.outdir, in_args.backend, in_args.server,
+                                               in_args.rest_server, in_args.species, in_args.email,
+                                               not in_args.no_scan, not in_args.no_sirna, in_args.queue_size,
+                                               in_args.scan_workers, outformat=in_args.outformat,
+                                               scan_server=in_args.scan_server,
+                                               poll_interval=in_args.poll_interval))
+    except (requests.RequestException, urllib.error.URLError, ps_scan_py3.ServiceError) as err:
+        sys.exit("\nPipeline failed: %s" % err)
+
+    # worker_sec is summed over all of a stage's workers, so it can be larger than wall_sec
+    report = "stage\titems\twall_sec\tworker_sec\titems_per_sec\n"
+    for stage in stage_stats:
+        report += "%s\n" % stage
+    with open(os.path.join(in_args.outdir, "pipeline_stats.tsv"), "w") as ofile:
+        ofile.write(report)
+
+    print("\n%s" % report)
+    print("Pipeline finished in %.2f seconds, output written to %s"
+          % (time.perf_counter() - start_time, os.path.abspath(in_args.outdir)))
+
+
+if __name__ == '__main__':
+    main()
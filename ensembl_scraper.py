@@ -11,7 +11,7 @@ details at http://www.gnu.org/licenses/.
 
 name: ensembl_scraper.py
 date: Jan-18-2015
-version: 1.1
+version: 1.2
 author: Stephen R. Bond
 email: steve.bond@nih.gov
 institute: Computational and Statistical Genomics Branch, Division of Intramural Research,
@@ -22,86 +22,206 @@ repository: https://github.com/biologyguy/public_scripts
 derivative work: No
 
 Description:
-Search ENSEMBL Metazoa for genes and print all returned IDs to a file, sorted by organism. For a detailed description of
-the parameters the script takes, navigate to the directory containing the program within a terminal window, and run the
-following command:
+Search ENSEMBL Metazoa for genes and print all returned IDs to a file, sorted by organism. Two backends are available:
+'html' pages through the Multi/Search/Results web interface, while 'rest' asks the Ensembl REST API for JSON xrefs, one
+request per species (several at once). The REST API has no free-text search, so the 'rest' backend only matches the
+search term as an exact gene symbol. Use --server to point either backend at a mirror or a local stub server. For a
+detailed description of the parameters the script takes, navigate to the directory containing the program within a
+terminal window, and run the following command:
 
     python ./ensembl_scraper.py -h
 """
 
-import requests
-from bs4 import BeautifulSoup
 import argparse
 import os
+import threading
+import time
+from urllib.parse import quote
 from sys import stdout, exit
 
-parser = argparse.ArgumentParser(prog="ensembl_scraper",
-                                 description="Search EnsemblMetazoa for a all genes returned from a search")
-parser.add_argument('search_term', help='What would you like to search for?', action='store')
-parser.add_argument('-o', '--outfile', help='Send the results to a file, instead of StdOut',
-                    action="store", default="%s/ensemble_ids.txt" % os.getcwd())
-
-in_args = parser.parse_args()
-
-# Run the search, and figure out how many pages of results are returned
-url = "http://metazoa.ensembl.org/Multi/Search/Results?q=%s;species=all;collection=all;site=ensemblunit"\
-      % in_args.search_term
-content = requests.get(url).text
-
-soup = BeautifulSoup(content)
-try:
-    paginate = soup.find('div', {"class": 'paginate'}).find_all('a')
-    max_page = 1
-    for page in paginate:
-        try:
-            if int(page.text) > max_page:
-                max_page = int(page.text)
-        except ValueError:
-            continue
-except AttributeError:
-    max_page = 1
-
-print("%s pages of results were returned" % max_page)
-ids = {}
-for page_num in range(max_page):
-    stdout.write("\rCollecting data from results page %s" % (page_num + 1),)
-    stdout.flush()
-
-    url = "http://metazoa.ensembl.org/Multi/Search/Results?page=%s;q=%s;species=all;collection=all;site=ensemblunit"\
-          % (page_num + 1, in_args.search_term)
-    content = requests.get(url).text
+HTML_SERVER = "http://metazoa.ensembl.org"
+REST_SERVER = "https://rest.ensembl.org"
+# Seconds to wait on any one request, how often to retry a rate limited (429) request, and how many species the rest
+# backend queries at once (Ensembl REST allows 15 requests per second)
+TIMEOUT = 60
+MAX_RETRIES = 5
+REST_WORKERS = 8
 
-    soup = BeautifulSoup(content)
 
-    for row in soup.find_all('div', {"class": 'row'}):
-        sub_soup = BeautifulSoup(str(row))
-        lhs = sub_soup.find('div', {"class": "lhs"}).text
-        rhs = sub_soup.find('div', {"class": "rhs"}).text
-
-        if lhs == "Gene ID":
-            gene_id = rhs
-
-        if lhs == "Species":
-            if rhs in ids:
-                ids[rhs].append(gene_id)
-            else:
-                ids[rhs] = [gene_id]
-
-if len(ids) == 0:
-    exit("\rNo records found for query '%s'" % in_args.search_term)
-
-output = ""
-for species in ids:
-    output += "%s\n" % species
-    for next_id in ids[species]:
-        output += "%s\n" % next_id
-    output += "\n"
-
-if in_args.outfile:
-    outfile = os.path.abspath(in_args.outfile)
-    with open(outfile, "w") as ofile:
-        ofile.write(output)
-    print("Output written to %s" % outfile)
-
-else:
-    print(output)
\ No newline at end of file
+def html_backend(search_term, server=HTML_SERVER, species_filter=None, progress=True):
+    import requests
+    from bs4 import BeautifulSoup
+
+    # Run the search, and figure out how many pages of results are returned
+    search_term = quote(search_term, safe="")
+    url = "%s/Multi/Search/Results?q=%s;species=all;collection=all;site=ensemblunit" % (server, search_term)
+    content = requests.get(url, timeout=TIMEOUT).text
+
+    soup = BeautifulSoup(content)
+    try:
+        paginate = soup.find('div', {"class": 'paginate'}).find_all('a')
+        max_page = 1
+        for page in paginate:
+            try:
+                if int(page.text) > max_page:
+                    max_page = int(page.text)
+            except ValueError:
+                continue
+    except AttributeError:
+        max_page = 1
+
+    if progress:
+        print("%s pages of results were returned" % max_page)
+    for page_num in range(max_page):
+        if progress:
+            stdout.write("\rCollecting data from results page %s" % (page_num + 1),)
+            stdout.flush()
+
+        url = "%s/Multi/Search/Results?page=%s;q=%s;species=all;collection=all;site=ensemblunit"\
+              % (server, page_num + 1, search_term)
+        content = requests.get(url, timeout=TIMEOUT).text
+
+        soup = BeautifulSoup(content)
+
+        for row in soup.find_all('div', {"class": 'row'}):
+            sub_soup = BeautifulSoup(str(row))
+            lhs = sub_soup.find('div', {"class": "lhs"}).text
+            rhs = sub_soup.find('div', {"class": "rhs"}).text
+
+            if lhs == "Gene ID":
+                gene_id = rhs
+
+            if lhs == "Species":
+                if species_filter and rhs not in species_filter:
+                    continue
+                yield rhs, gene_id
+
+
+def rest_request(session, method, url, **kwargs):
+    # Ensembl REST answers 429 with a Retry-After header when the rate limit is exceeded. After MAX_RETRIES the 429
+    # response is returned, so that raise_for_status() reports it.
+    kwargs.setdefault("timeout", TIMEOUT)
+    for _ in range(MAX_RETRIES):
+        response = session.request(method, url, **kwargs)
+        if response.status_code != 429:
+            break
+        time.sleep(float(response.headers.get("Retry-After", 1)))
+    else:
+        response = session.request(method, url, **kwargs)
+    return response
+
+
+def rest_backend(search_term, server=REST_SERVER, species_filter=None, progress=True, division="EnsemblMetazoa",
+                 workers=REST_WORKERS):
+    # Ensembl REST has no free-text search, so this looks the search term up as an exact gene symbol (xrefs/symbol)
+    import requests
+    from concurrent.futures import ThreadPoolExecutor
+
+    sessions = threading.local()
+
+    def get_session():
+        if not hasattr(sessions, "session"):
+            sessions.session = requests.Session()
+            sessions.session.headers.update({"Content-Type": "application/json", "Accept": "application/json"})
+        return sessions.session
+
+    # One request for the species list of the division, then one JSON xrefs request per species, several at once
+    response = rest_request(get_session(), "GET", "%s/info/species" % server, params={"division": division})
+    response.raise_for_status()
+    species_list = response.json()["species"]
+    if species_filter:
+        species_list = [species for species in species_list
+                        if species["name"] in species_filter or species["display_name"] in species_filter]
+
+    def xrefs(species):
+        # An unknown symbol comes back as 200 with an empty list; a 400 means a bad species or request, so raise on it
+        url = "%s/xrefs/symbol/%s/%s" % (server, quote(species["name"], safe=""), quote(search_term, safe=""))
+        response = rest_request(get_session(), "GET", url, params={"object_type": "gene"})
+        response.raise_for_status()
+        return [xref["id"] for xref in response.json() if xref["type"] == "gene"]
+
+    if progress:
+        print("%s species to query" % len(species_list))
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        # map() hands back the results in species order, as soon as each one (and those before it) is ready
+        for count, (species, gene_ids) in enumerate(zip(species_list, executor.map(xrefs, species_list))):
+            if progress:
+                stdout.write("\rCollecting data from species %s of %s" % (count + 1, len(species_list)),)
+                stdout.flush()
+            for gene_id in gene_ids:
+                yield species["display_name"], gene_id
+    finally:
+        # Don't send the remaining requests if the caller stops early or a request fails
+        executor.shutdown(cancel_futures=True)
+
+
+def parse_output(handle):
+    # The output format is a species line, one gene ID per line, and a blank line between species
+    ids = {}
+    species = None
+    for line in handle:
+        line = line.strip()
+        if not line:
+            species = None
+        elif species is None:
+            species = line
+            ids.setdefault(species, [])
+        else:
+            ids[species].append(line)
+    return ids
+
+
+def format_output(ids):
+    output = ""
+    for species in ids:
+        output += "%s\n" % species
+        for next_id in ids[species]:
+            output += "%s\n" % next_id
+        output += "\n"
+    return output
+
+
+# Backends are generators of (species, gene_id) tuples, so callers can consume hits while the search is running.
+# progress=False keeps them from writing progress messages to stdout.
+BACKENDS = {"html": (html_backend, HTML_SERVER), "rest": (rest_backend, REST_SERVER)}
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="ensembl_scraper",
+                                     description="Search EnsemblMetazoa for a all genes returned from a search")
+    parser.add_argument('search_term', help='What would you like to search for?', action='store')
+    parser.add_argument('-o', '--outfile', help='Send the results to a file, instead of StdOut',
+                        action="store", default="%s/ensemble_ids.txt" % os.getcwd())
+    parser.add_argument('-b', '--backend', help='Scrape the html search pages (free-text search), or query the JSON '
+                                                'REST API (exact gene symbol match only)',
+                        choices=sorted(BACKENDS), default="html")
+    parser.add_argument('-s', '--server', help='Base url of the Ensembl server (defaults depend on backend)',
+                        action="store")
+    parser.add_argument('-sp', '--species', help='Restrict the search to these species', nargs="+", action="store")
+
+    in_args = parser.parse_args()
+
+    backend, server = BACKENDS[in_args.backend]
+    server = in_args.server.rstrip("/") if in_args.server else server
+    ids = {}
+    for species, gene_id in backend(in_args.search_term, server, in_args.species):
+        ids.setdefault(species, []).append(gene_id)
+
+    if len(ids) == 0:
+        exit("\rNo records found for query '%s'" % in_args.search_term)
+
+    output = format_output(ids)
+
+    if in_args.outfile:
+        outfile = os.path.abspath(in_args.outfile)
+        with open(outfile, "w") as ofile:
+            ofile.write(output)
+        print("Output written to %s" % outfile)
+
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -44,16 +44,11 @@ http://www.ebi.ac.uk/Tools/webservices/tutorials/python
 ======================================================================
 """
 
-# Load libraries
-import platform
+# Load libraries (urllib.request, xml and platform are only imported when a request is made, as they dominate startup)
 import os
 import re
 import sys
 import time
-import urllib.parse
-import urllib.request
-import urllib.error
-import xml.etree.ElementTree as eTree
 from optparse import OptionParser
 from io import StringIO
 
@@ -63,71 +58,15 @@ checkInterval = 10
 outputLevel = 2
 # Debug level
 debugLevel = 0
-# Number of option arguments.
-numOpts = len(sys.argv)
+# Base URL for each service
+serviceUrls = {'prosite_scan': 'http://www.ebi.ac.uk/Tools/services/rest/ps_scan',
+               'interpro': 'http://www.ebi.ac.uk/Tools/services/rest/iprscan5'}
+baseUrl = serviceUrls['prosite_scan']
 
-# Usage message
-usage = "Usage: %prog [options...] [seqFile]"
-description = """Identify protein family, domain and signal signatures in a protein sequence using InterProScan.
-For more information on InterPro and InterProScan refer to http://www.ebi.ac.uk/interpro/"""
-epilog = """For further information about the PROSITE Scan (REST) web service, see
-http://www.ebi.ac.uk/Tools/webservices/services/pfa/ps_scan_rest"""
-version = "ps_scan_py3.py 1.0 Nov-20-2014"
-# Process command-line options
-parser = OptionParser(usage=usage, description=description, epilog=epilog, version=version)
-# Tool specific options
-parser.add_option('--appl', help='signature methods to use, see --paramDetail appl')
-parser.add_option('--goterms', action="store_true", help='enable inclusion of GO terms')
-parser.add_option('--nogoterms', action="store_true", help='disable inclusion of GO terms')
-parser.add_option('--pathways', action="store_true", help='enable inclusion of pathway terms')
-parser.add_option('--nopathways', action="store_true", help='disable inclusion of pathway terms')
-parser.add_option('--sequence', action="store", help='Input sequence explicitly on command line')
-# General options
-parser.add_option('--email', help='e-mail address')
-parser.add_option('--title', help='job title')
-parser.add_option('--outfile', help='file name for results')
-parser.add_option('--outformat', help='output format for results')
-parser.add_option('--async', action='store_true', help='asynchronous mode')
-parser.add_option('--jobId', action="store", help='job identifier')
-parser.add_option('--polljob', action="store_true", help='get job result')
-parser.add_option('--status', action="store_true", help='get job status')
-parser.add_option('--resultTypes', action='store_true', help='get result types')
-parser.add_option('--params', action='store_true', help='list input parameters')
-parser.add_option('--paramDetail', help='get details for parameter')
-parser.add_option('--outputLevel', type=int,
-                  help='Explicilty set the output verbosity. 0 == quiet, 3 == verbose, 1 and 2 are intermediate.')
-parser.add_option('--quiet', action='store_true', help='decrease output level')
-parser.add_option('--verbose', action='store_true', help='increase output level')
-parser.add_option('--service', choices=['prosite_scan', 'interpro'], default='prosite_scan',
-                  help='Which EMBL-EBI REST service do you want?')
-parser.add_option('--debugLevel', type='int', default=debugLevel,
-                  help='debug output level. Levels implemented are [1, 2, 11, 12]')
-
-(options, args) = parser.parse_args()
-
-# Base URL for service
-if options.service == "prosite_scan":
-    baseUrl = 'http://www.ebi.ac.uk/Tools/services/rest/ps_scan'
-elif options.service == "interpro":
-    baseUrl = 'http://www.ebi.ac.uk/Tools/services/rest/iprscan5'
-
-
-if len(args) == 0:
-    args = [False]
-
-# Set output level (note order of precedence)
-if options.outputLevel:
-    outputLevel = options.outputLevel
-
-if options.verbose:
-    outputLevel = 3
-
-if options.quiet:
-    outputLevel = 0
 
-# Debug level
-if options.debugLevel:
-    debugLevel = options.debugLevel
+# Raised when a service request fails, so that library users can recover rather than exit
+class ServiceError(Exception):
+    pass
 
 
 # Debug print
@@ -146,6 +85,8 @@ def print_stdout(message, level, line_break=True):
 
 # User-agent for request (see RFC2616).
 def get_user_agent():
+    import platform
+    import urllib.request
     print_debug_message('get_user_agent', 'Begin', 11)
     # Agent string for urllib.request library.
     urllib_agent = 'Python-urllib/%s' % urllib.request.__version__
@@ -166,6 +107,9 @@ def get_user_agent():
 
 # Wrapper for a REST (HTTP GET) request
 def rest_request(url):
+    import urllib.request
+    import urllib.error
+    import xml.etree.ElementTree as eTree
     print_debug_message('rest_request', 'Begin', 11)
     print_debug_message('rest_request', 'url: %s' % url, 11)
     # Errors are indicated by HTTP status codes.
@@ -180,11 +124,13 @@ def rest_request(url):
         req_h.close()
     # Errors are indicated by HTTP status codes.
     except urllib.error.HTTPError as ex:
-        # Trap exception and output the document to get error message.
-        error = prep_xml(ex.file.read().decode())
-        descr = error.find("description").text
-        print("%s %s\n%s" % (ex.code, ex.msg, descr))
-        sys.exit()
+        # Trap exception and use the document to get error message.
+        descr = ex.file.read().decode()
+        try:
+            descr = prep_xml(descr).find("description").text
+        except (eTree.ParseError, AttributeError):  # Not an EBI error document
+            pass
+        raise ServiceError("%s %s\n%s" % (ex.code, ex.msg, descr))
     print_debug_message('rest_request', 'End', 11)
     return result
 
@@ -241,13 +187,16 @@ def print_get_parameter_details(param_name):
 
 
 # Submit job
-def service_run(email, title, run_params):
+def service_run(email, title, run_params, base_url=None):
+    import urllib.parse
+    import urllib.request
+    import urllib.error
     print_debug_message('service_run', 'Begin', 1)
     # Insert e-mail and title into params
     run_params['email'] = email
     if title:
         run_params['title'] = title
-    request_url = '%s/run/' % baseUrl
+    request_url = '%s/run/' % (base_url or baseUrl)
     print_debug_message('service_run', 'request_url: %s' % request_url, 2)
     # Signature methods requires special handling (list)
     appl_data = ''
@@ -288,10 +237,10 @@ def service_run(email, title, run_params):
 
 
 # Get job status
-def service_get_status(job_id):
+def service_get_status(job_id, base_url=None):
     print_debug_message('service_get_status', 'Begin', 1)
     print_debug_message('service_get_status', 'job_id: %s' % job_id, 2)
-    request_url = '%s/status/%s' % (baseUrl, job_id)
+    request_url = '%s/status/%s' % (base_url or baseUrl, job_id)
     print_debug_message('service_get_status', 'request_url: %s' % request_url, 2)
     status = rest_request(request_url)
     print_debug_message('service_get_status', 'status: %s' % status.decode(), 2)
@@ -308,16 +257,17 @@ def print_get_status(job_id):
     
 
 def prep_xml(xml):
+    import xml.etree.ElementTree as eTree
     file_like = StringIO(xml)
     xml_tree = eTree.parse(file_like)
     return xml_tree.getroot()
 
 
 # Get available result types for job
-def service_get_result_types(job_id):
+def service_get_result_types(job_id, base_url=None):
     print_debug_message('service_get_result_types', 'Begin', 1)
     print_debug_message('service_get_result_types', 'job_id: %s' % job_id, 2)
-    request_url = '%s/resulttypes/%s' % (baseUrl, job_id)
+    request_url = '%s/resulttypes/%s' % (base_url or baseUrl, job_id)
     print_debug_message('service_get_result_types', 'request_url: %s' % request_url, 2)
     xml_doc = prep_xml(rest_request(request_url).decode())
     output = []
@@ -350,22 +300,22 @@ def print_get_result_types(job_id):
 
 
 # Get result
-def service_get_result(job_id, result_type):
+def service_get_result(job_id, result_type, base_url=None):
     print_debug_message('service_get_result', 'Begin', 1)
     print_debug_message('service_get_result', 'job_id: %s' % job_id, 2)
     print_debug_message('service_get_result', 'type: %s' % result_type, 2)
-    request_url = '%s/result/%s/%s' % (baseUrl, job_id, result_type)
+    request_url = '%s/result/%s/%s' % (base_url or baseUrl, job_id, result_type)
     result = rest_request(request_url)
     print_debug_message('service_get_result', 'End', 1)
     return result
 
 
 # Client-side poll
-def client_poll(job_id):
+def client_poll(job_id, base_url=None):
     print_debug_message('client_poll', 'Begin', 1)
     result = 'PENDING'
     while result == 'RUNNING' or result == 'PENDING':
-        result = service_get_status(job_id).decode("utf-8")
+        result = service_get_status(job_id, base_url).decode("utf-8")
         print_stdout(result, 2)
         if result == 'RUNNING' or result == 'PENDING':
             time.sleep(checkInterval)
@@ -373,25 +323,27 @@ def client_poll(job_id):
 
 
 # Get result for a job_id
-def get_result(job_id):
+# (base_url overrides the module's baseUrl, and poll=False skips the status check for jobs known to be finished)
+def get_result(job_id, outfile=None, outformat=None, base_url=None, poll=True):
     print_debug_message('get_result', 'Begin', 1)
     print_debug_message('get_result', 'job_id: %s' % job_id, 1)
     # Check status and wait if necessary
-    client_poll(job_id)
+    if poll:
+        client_poll(job_id, base_url)
     # Get available result types
-    result_types = service_get_result_types(job_id)
+    result_types = service_get_result_types(job_id, base_url)
     for resultType in result_types:
         # Derive the filename for the result
         identifier = resultType.find("identifier").text
         file_suffix = resultType.find("fileSuffix").text
-        if options.outfile:
-            filename = "%s.%s.%s" % (options.outfile, identifier, file_suffix)
+        if outfile:
+            filename = "%s.%s.%s" % (outfile, identifier, file_suffix)
         else:
             filename = "%s.%s.%s" % (job_id, identifier, file_suffix)
         # Write a result file
-        if not options.outformat or options.outformat == identifier:
+        if not outformat or outformat == identifier:
             # Get the result
-            result = service_get_result(job_id, identifier)
+            result = service_get_result(job_id, identifier, base_url)
             with open(filename, 'wb') as fh:
                 fh.write(result)
             print_stdout(filename, 3)
@@ -413,85 +365,158 @@ def read_file(filename):
     print_debug_message('read_file', 'End', 1)
     return data
 
-# No options... print help.
-if numOpts < 2:
-    parser.print_help()
 
-# List parameters
-elif options.params:
-    print_get_parameters()
+def main():
+    global baseUrl, outputLevel, debugLevel
+    # Number of option arguments.
+    numOpts = len(sys.argv)
+
+    # Usage message
+    usage = "Usage: %prog [options...] [seqFile]"
+    description = """Identify protein family, domain and signal signatures in a protein sequence using InterProScan.
+For more information on InterPro and InterProScan refer to http://www.ebi.ac.uk/interpro/"""
+    epilog = """For further information about the PROSITE Scan (REST) web service, see
+http://www.ebi.ac.uk/Tools/webservices/services/pfa/ps_scan_rest"""
+    version = "ps_scan_py3.py 1.0 Nov-20-2014"
+    # Process command-line options
+    parser = OptionParser(usage=usage, description=description, epilog=epilog, version=version)
+    # Tool specific options
+    parser.add_option('--appl', help='signature methods to use, see --paramDetail appl')
+    parser.add_option('--goterms', action="store_true", help='enable inclusion of GO terms')
+    parser.add_option('--nogoterms', action="store_true", help='disable inclusion of GO terms')
+    parser.add_option('--pathways', action="store_true", help='enable inclusion of pathway terms')
+    parser.add_option('--nopathways', action="store_true", help='disable inclusion of pathway terms')
+    parser.add_option('--sequence', action="store", help='Input sequence explicitly on command line')
+    # General options
+    parser.add_option('--email', help='e-mail address')
+    parser.add_option('--title', help='job title')
+    parser.add_option('--outfile', help='file name for results')
+    parser.add_option('--outformat', help='output format for results')
+    parser.add_option('--async', action='store_true', dest='async_mode', help='asynchronous mode')
+    parser.add_option('--jobId', action="store", help='job identifier')
+    parser.add_option('--polljob', action="store_true", help='get job result')
+    parser.add_option('--status', action="store_true", help='get job status')
+    parser.add_option('--resultTypes', action='store_true', help='get result types')
+    parser.add_option('--params', action='store_true', help='list input parameters')
+    parser.add_option('--paramDetail', help='get details for parameter')
+    parser.add_option('--outputLevel', type=int,
+                      help='Explicilty set the output verbosity. 0 == quiet, 3 == verbose, 1 and 2 are intermediate.')
+    parser.add_option('--quiet', action='store_true', help='decrease output level')
+    parser.add_option('--verbose', action='store_true', help='increase output level')
+    parser.add_option('--service', choices=['prosite_scan', 'interpro'], default='prosite_scan',
+                      help='Which EMBL-EBI REST service do you want?')
+    parser.add_option('--debugLevel', type='int', default=debugLevel,
+                      help='debug output level. Levels implemented are [1, 2, 11, 12]')
+
+    (options, args) = parser.parse_args()
+
+    # Base URL for service
+    baseUrl = serviceUrls[options.service]
+
+    if len(args) == 0:
+        args = [False]
+
+    # Set output level (note order of precedence)
+    if options.outputLevel:
+        outputLevel = options.outputLevel
+
+    if options.verbose:
+        outputLevel = 3
+
+    if options.quiet:
+        outputLevel = 0
+
+    # Debug level
+    if options.debugLevel:
+        debugLevel = options.debugLevel
+
+    try:
+        # No options... print help.
+        if numOpts < 2:
+            parser.print_help()
+
+        # List parameters
+        elif options.params:
+            print_get_parameters()
+
+        # Get parameter details
+        elif options.paramDetail:
+            print_get_parameter_details(options.paramDetail)
+
+
+        # Get job status
+        elif options.status:
+            if not options.jobId:
+                sys.exit("Error: You must include --jobId to retrieve status.")
+            else:
+                print_get_status(options.jobId)
+
+        # List result types for job
+        elif options.resultTypes:
+            if not options.jobId:
+                sys.exit("Error: You must include --jobId to retrieve result types.")
+            else:
+                print_get_result_types(options.jobId)
+
+        # Get results for job
+        elif options.polljob:
+            if not options.jobId:
+                sys.exit("Error: You must include --jobId to poll a job.")
+            else:
+                get_result(options.jobId, options.outfile, options.outformat)
+
+        # Submit job
+        elif args[0] or options.sequence:
+            # Make sure an email address is supplied if submitting a job
+            if not options.email:
+                sys.exit("Error: You must include an email address when submitting a job. E.g., $: "
+                         "./iprscan5_py3.py --email YOU@EMAIL.COM my_seq_file.fasta")
+
+            params = {}
+            if args[0]:
+                if os.access(args[0], os.R_OK):  # Read file into content
+                    params['sequence'] = read_file(args[0])
+                else:  # Argument is a sequence id
+                    params['sequence'] = args[0]
+            elif options.sequence:  # Passing in the actual sequence on command line
+                sequence = options.sequence.strip()
+                sequence = re.sub("\*$", "", sequence)
+                sequence = re.sub(" \t", "", sequence)
+                if re.search("[^A-Za-z\n]", re.sub(">.*\n", "", sequence)):
+                    sys.exit("Error: Invalid characters found in the sequence provided.")
+                params['sequence'] = sequence
+
+            # Map flag options to boolean values.
+            if options.goterms:
+                params['goterms'] = True
+            elif options.nogoterms:
+                params['goterms'] = False
+            if options.pathways:
+                params['pathways'] = True
+            elif options.nopathways:
+                params['pathways'] = False
+            # Add the other options (if defined)
+            if options.appl:
+                params['appl'] = re.split('[ \t\n,;]+', options.appl)
+    
+            # Submit the job
+            new_job_id = service_run(options.email, options.title, params)
+            if options.async_mode:  # Async mode
+                print_stdout("Project ID: ", 2, line_break=False)
+                print_stdout(new_job_id, 1)
+            else:  # Sync mode
+                print_stdout("Project ID: ", 2, line_break=False)
+                print_stdout(new_job_id, 1)
+                time.sleep(5)
+                get_result(new_job_id, options.outfile, options.outformat)
 
-# Get parameter details
-elif options.paramDetail:
-    print_get_parameter_details(options.paramDetail)
+        else:
+            print('Error: unrecognised argument combination', file=sys.stderr)
+            parser.print_help()
 
+    except ServiceError as err:
+        sys.exit(str(err))
 
-# Get job status
-elif options.status:
-    if not options.jobId:
-        sys.exit("Error: You must include --jobId to retrieve status.")
-    else:
-        print_get_status(options.jobId)
-
-# List result types for job
-elif options.resultTypes:
-    if not options.jobId:
-        sys.exit("Error: You must include --jobId to retrieve result types.")
-    else:
-        print_get_result_types(options.jobId)
-
-# Get results for job
-elif options.polljob:
-    if not options.jobId:
-        sys.exit("Error: You must include --jobId to poll a job.")
-    else:
-        get_result(options.jobId)
 
-# Submit job
-elif args[0] or options.sequence:
-    # Make sure an email address is supplied if submitting a job
-    if not options.email:
-        sys.exit("Error: You must include an email address when submitting a job. E.g., $: ./iprscan5_py3.py --email "
-                 "YOU@EMAIL.COM my_seq_file.fasta")
-
-    params = {}
-    if args[0]:
-        if os.access(args[0], os.R_OK):  # Read file into content
-            params['sequence'] = read_file(args[0])
-        else:  # Argument is a sequence id
-            params['sequence'] = args[0]
-    elif options.sequence:  # Passing in the actual sequence on command line
-        sequence = options.sequence.strip()
-        sequence = re.sub("\*$", "", sequence)
-        sequence = re.sub(" \t", "", sequence)
-        if re.search("[^A-Za-z\n]", re.sub(">.*\n", "", sequence)):
-            sys.exit("Error: Invalid characters found in the sequence provided.")
-        params['sequence'] = sequence
-
-    # Map flag options to boolean values.
-    if options.goterms:
-        params['goterms'] = True
-    elif options.nogoterms:
-        params['goterms'] = False
-    if options.pathways:
-        params['pathways'] = True
-    elif options.nopathways:
-        params['pathways'] = False
-    # Add the other options (if defined)
-    if options.appl:
-        params['appl'] = re.split('[ \t\n,;]+', options.appl)
-    
-    # Submit the job
-    new_job_id = service_run(options.email, options.title, params)
-    if options.async:  # Async mode
-        print_stdout("Project ID: ", 2, line_break=False)
-        print_stdout(new_job_id, 1)
-    else:  # Sync mode
-        print_stdout("Project ID: ", 2, line_break=False)
-        print_stdout(new_job_id, 1)
-        time.sleep(5)
-        get_result(new_job_id)
-
-else:
-    print('Error: unrecognised argument combination', file=sys.stderr)
-    parser.print_help()
+if __name__ == '__main__':
+    main()
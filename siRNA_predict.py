@@ -36,16 +36,6 @@ from re import findall, sub
 import argparse
 from os.path import isfile
 
-parser = argparse.ArgumentParser(prog="siRNA prediction",
-                                 description="Implementation of siRNA design algorithm developed by "
-                                             "Reynolds et al., 2004, Nat Biotechnol 22(3):326-330",
-                                 formatter_class=argparse.ArgumentDefaultsHelpFormatter)
-
-parser.add_argument('sequence', help='Input DNA sequence to analyze (FASTA file or string)')
-parser.add_argument('-c', '--csv', help='Output as pure CSV', action="store_true")
-
-in_args = parser.parse_args()
-
 
 def si_score(sequence):
     _score = 0
@@ -85,47 +75,72 @@ def si_score(sequence):
     return _score
 
 
-if isfile(in_args.sequence):
-    with open(in_args.sequence, "r") as ifile:
-        full_seq = ifile.read()
-
-    full_seq = sub(">.*", "", full_seq).upper()
-    full_seq = sub("\s[0-9]", "", full_seq)
-    full_seq = sub("U", "T", full_seq)
-    full_seq = sub("[^ATCG]", "X", full_seq)
-
-else:
-    full_seq = in_args.sequence.upper()
-    full_seq = sub("U", "T", full_seq)
-    full_seq = sub("[^ATCG]", "X", full_seq)
-
-si_seqs_list = [[], [], [], [], [], [], [], [], [], []]
-for i in range(len(full_seq) - 18):
-    seq = full_seq[i:i + 19]
-    score = si_score(seq)
-    score = score if score >= 0 else 0
-    si_seqs_list[score].append((seq, i + 1))
-
-biggest_column = 0
-for si_seq in si_seqs_list:
-    if len(si_seq) > biggest_column:
-        biggest_column = len(si_seq)
-
-# super clunky text formating... But looks good in terminal
-output = "Score:\t\t9\t\t\t\t8\t\t\t\t7\t\t\t\t6\t\t\t\t5\t\t\t\t4\t\t\t\t3\t\t\t\t2\t\t\t\t1\t\t\t\t0\n"
-for row in range(biggest_column):
-    for index in [9, 8, 7, 6, 5, 4, 3, 2, 1, 0]:
-        if row < len(si_seqs_list[index]):
-            output += "%s— %s\t" % (str(si_seqs_list[index][row][1]).ljust(5), si_seqs_list[index][row][0])
-        else:
-            output += "\t\t\t\t"
-    output += "\n"
-
-if in_args.csv:
-    output = sub("\t{4}", ",,", output)
-    output = sub("\t{2}", ",", output)
-    output = sub("\t", ",", output)
-    output = sub("—", ",", output)
-    output = sub(" ", "", output)
-
-print(output)
+def clean_sequence(sequence):
+    sequence = sequence.upper()
+    sequence = sub("U", "T", sequence)
+    sequence = sub("[^ATCG]", "X", sequence)
+    return sequence
+
+
+def score_sequence(full_seq):
+    si_seqs_list = [[], [], [], [], [], [], [], [], [], []]
+    for i in range(len(full_seq) - 18):
+        seq = full_seq[i:i + 19]
+        score = si_score(seq)
+        score = score if score >= 0 else 0
+        si_seqs_list[score].append((seq, i + 1))
+    return si_seqs_list
+
+
+def format_output(si_seqs_list, csv=False):
+    biggest_column = 0
+    for si_seq in si_seqs_list:
+        if len(si_seq) > biggest_column:
+            biggest_column = len(si_seq)
+
+    # super clunky text formating... But looks good in terminal
+    output = "Score:\t\t9\t\t\t\t8\t\t\t\t7\t\t\t\t6\t\t\t\t5\t\t\t\t4\t\t\t\t3\t\t\t\t2\t\t\t\t1\t\t\t\t0\n"
+    for row in range(biggest_column):
+        for index in [9, 8, 7, 6, 5, 4, 3, 2, 1, 0]:
+            if row < len(si_seqs_list[index]):
+                output += "%s— %s\t" % (str(si_seqs_list[index][row][1]).ljust(5), si_seqs_list[index][row][0])
+            else:
+                output += "\t\t\t\t"
+        output += "\n"
+
+    if csv:
+        output = sub("\t{4}", ",,", output)
+        output = sub("\t{2}", ",", output)
+        output = sub("\t", ",", output)
+        output = sub("—", ",", output)
+        output = sub(" ", "", output)
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="siRNA prediction",
+                                     description="Implementation of siRNA design algorithm developed by "
+                                                 "Reynolds et al., 2004, Nat Biotechnol 22(3):326-330",
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+
+    parser.add_argument('sequence', help='Input DNA sequence to analyze (FASTA file or string)')
+    parser.add_argument('-c', '--csv', help='Output as pure CSV', action="store_true")
+
+    in_args = parser.parse_args()
+
+    if isfile(in_args.sequence):
+        with open(in_args.sequence, "r") as ifile:
+            full_seq = ifile.read()
+
+        full_seq = sub(">.*", "", full_seq)
+        full_seq = sub("\s[0-9]", "", full_seq)
+        full_seq = clean_sequence(full_seq)
+
+    else:
+        full_seq = clean_sequence(in_args.sequence)
+
+    print(format_output(score_sequence(full_seq), in_args.csv))
+
+
+if __name__ == '__main__':
+    main()
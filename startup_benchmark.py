@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU General Public
+License as published by the Free Software Foundation, version 2 of the License (GPLv2).
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details at http://www.gnu.org/licenses/.
+
+name: startup_benchmark.py
+date: Oct-18-2026
+version: 1.0
+author: Stephen R. Bond
+email: steve.bond@nih.gov
+institute: Computational and Statistical Genomics Branch, Division of Intramural Research,
+           National Human Genome Research Institute, National Institutes of Health
+           Bethesda, MD
+repository: https://github.com/biologyguy/public_scripts
+© license: Gnu General Public License, Version 2.0 (http://www.gnu.org/licenses/gpl.html)
+derivative work: No
+
+Description:
+Measure the per-invocation overhead of the scripts in this repository. For each script, 'python -X importtime' reports
+the cumulative cost of importing it as a library (and flags any heavy dependency that was loaded up front), then the
+best wall time of a bare import and of '--help' is taken over several runs, minus the cost of starting the interpreter.
+Use --max_ms to make the benchmark fail when a script's startup overhead creeps up. For a detailed description of the
+parameters the script takes, navigate to the directory containing the program within a terminal window, and run the
+following command:
+
+    python ./startup_benchmark.py -h
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+SCRIPTS = ["ensembl_scraper", "ensembl_id_db", "ensembl_pipeline", "ps_scan_py3", "siRNA_predict"]
+
+# Dependencies that should only be imported once a script actually needs them
+HEAVY_MODULES = ["requests", "bs4", "asyncio", "urllib.request", "xml.etree.ElementTree", "sqlite3"]
+
+
+def import_time(module, cwd):
+    # -X importtime writes 'import time: self [us] | cumulative | imported package' lines to stderr
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import %s" % module], cwd=cwd,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, package = line[len("import time:"):].split("|")
+        try:
+            cumulative[package.strip()] = int(cumulative_us)
+        except ValueError:  # Header line
+            continue
+    heavy = [heavy_module for heavy_module in HEAVY_MODULES if heavy_module in cumulative]
+    return cumulative.get(module, 0) / 1000., heavy
+
+
+def wall_time(command, cwd, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        timings.append((time.perf_counter() - start) * 1000)
+    # The fastest run is the least disturbed by everything else happening on the machine
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="startup_benchmark",
+                                     description="Measure import and --help overhead of the scripts in this repo",
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('scripts', help='Scripts to benchmark', nargs="*", default=SCRIPTS)
+    parser.add_argument('-r', '--repeats', help='Number of runs to take the best time from', type=int, default=10)
+    parser.add_argument('-m', '--max_ms', help='Fail if any --help run takes longer than this (ms, minus interpreter '
+                                               'startup)', type=float)
+
+    in_args = parser.parse_args()
+    cwd = os.path.dirname(os.path.abspath(__file__))
+
+    baseline = wall_time([sys.executable, "-c", "pass"], cwd, in_args.repeats)
+    print("Interpreter startup: %.1f ms (subtracted from the import and --help timings)\n" % baseline)
+
+    output = "script\timporttime_ms\timport_ms\thelp_ms\theavy_imports\n"
+    too_slow = []
+    for script in in_args.scripts:
+        script = os.path.splitext(os.path.basename(script))[0]
+        import_ms, heavy = import_time(script, cwd)
+        noop_ms = max(wall_time([sys.executable, "-c", "import %s" % script], cwd, in_args.repeats) - baseline, 0.)
+        help_ms = max(wall_time([sys.executable, "%s.py" % script, "--help"], cwd, in_args.repeats) - baseline, 0.)
+        output += "%s\t%.1f\t%.1f\t%.1f\t%s\n" % (script, import_ms, noop_ms, help_ms, ",".join(heavy) or "-")
+        if in_args.max_ms is not None and help_ms > in_args.max_ms:
+            too_slow.append(script)
+
+    print(output)
+    if too_slow:
+        sys.exit("Startup overhead above %s ms: %s" % (in_args.max_ms, ", ".join(too_slow)))
+
+
+if __name__ == '__main__':
+    main()
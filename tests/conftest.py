@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # server.routes maps (method, path prefix) to view(path, query, body) -> (status code, content)
+    def respond(self, method):
+        url = urlsplit(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        self.server.requests.append((method, self.path))
+
+        code, content = 404, {"error": "Not found"}
+        for route_method, prefix in sorted(self.server.routes, key=lambda route: -len(route[1])):
+            if route_method == method and url.path.startswith(prefix):
+                code, content = self.server.routes[(route_method, prefix)](url.path, url.query, body)
+                break
+
+        if isinstance(content, (dict, list)):
+            content_type, data = "application/json", json.dumps(content).encode()
+        else:
+            content_type, data = "text/plain", content.encode()
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self.respond("GET")
+
+    def do_POST(self):
+        self.respond("POST")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    servers = []
+
+    def start(routes):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        server.daemon_threads = True
+        server.routes = routes
+        server.requests = []
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return "http://127.0.0.1:%s" % server.server_address[1], server.requests
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
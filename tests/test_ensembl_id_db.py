@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import io
+
+import pytest
+
+import ensembl_id_db
+import ensembl_scraper
+
+SCRAPER_OUTPUT = """Caenorhabditis japonica
+CJA19617
+CJA37862
+
+Apis mellifera
+AM1
+SHARED1
+
+"""
+
+OTHER_OUTPUT = """Caenorhabditis japonica
+CJA19617
+
+Nasonia vitripennis
+NV1
+SHARED1
+
+"""
+
+
+@pytest.fixture
+def conn(tmp_path):
+    connection = ensembl_id_db.connect(str(tmp_path / "ids.db"))
+    ensembl_id_db.import_ids(connection, "foo", ensembl_scraper.parse_output(io.StringIO(SCRAPER_OUTPUT)))
+    ensembl_id_db.import_ids(connection, "bar", ensembl_scraper.parse_output(io.StringIO(OTHER_OUTPUT)))
+    yield connection
+    connection.close()
+
+
+def test_parse_output():
+    assert ensembl_scraper.parse_output(io.StringIO(SCRAPER_OUTPUT)) == {
+        "Caenorhabditis japonica": ["CJA19617", "CJA37862"], "Apis mellifera": ["AM1", "SHARED1"]}
+
+
+def test_import_and_reimport(conn):
+    assert ensembl_id_db.list_queries(conn) == ["bar", "foo"]
+    ids = ensembl_scraper.parse_output(io.StringIO(SCRAPER_OUTPUT))
+    assert ensembl_id_db.import_ids(conn, "foo", ids) == 0
+    ids["Apis mellifera"].append("AM2")
+    assert ensembl_id_db.import_ids(conn, "foo", ids) == 1
+    assert ensembl_id_db.list_queries(conn) == ["bar", "foo"]
+
+
+def test_species_for_query(conn):
+    assert ensembl_id_db.species_for_query(conn, "foo") == [("Apis mellifera", 2), ("Caenorhabditis japonica", 2)]
+    assert ensembl_id_db.species_for_query(conn, "baz") == []
+
+
+def test_lookup_id(conn):
+    assert ensembl_id_db.lookup_id(conn, "CJA19617") == [("Caenorhabditis japonica", "bar"),
+                                                         ("Caenorhabditis japonica", "foo")]
+    assert ensembl_id_db.lookup_id(conn, "SHARED1") == [("Apis mellifera", "foo"), ("Nasonia vitripennis", "bar")]
+    assert ensembl_id_db.lookup_id(conn, "unknown") == []
+
+
+def test_set_operations(conn):
+    assert ensembl_id_db.set_operation(conn, "union", ["foo", "bar"]) == ["AM1", "CJA19617", "CJA37862", "NV1",
+                                                                          "SHARED1"]
+    assert ensembl_id_db.set_operation(conn, "intersect", ["foo", "bar"]) == ["CJA19617", "SHARED1"]
+    assert ensembl_id_db.set_operation(conn, "difference", ["foo", "bar"]) == ["AM1", "CJA37862"]
+    assert ensembl_id_db.set_operation(conn, "difference", ["foo", "bar"], "species") == ["Apis mellifera"]
+    with pytest.raises(ValueError):
+        ensembl_id_db.set_operation(conn, "xor", ["foo", "bar"])
+    with pytest.raises(ValueError):
+        ensembl_id_db.set_operation(conn, "union", ["foo"], "name")
+
+
+def test_set_operation_single_query_is_distinct(conn):
+    ensembl_id_db.import_ids(conn, "baz", {"Apis mellifera": ["SHARED1"], "Nasonia vitripennis": ["SHARED1"]})
+    assert ensembl_id_db.set_operation(conn, "union", ["baz"]) == ["SHARED1"]
+
+
+def test_export_round_trip(conn, tmp_path):
+    exported = ensembl_scraper.format_output(ensembl_id_db.export_ids(conn, ["foo"]))
+    assert ensembl_scraper.parse_output(io.StringIO(exported)) == {
+        "Apis mellifera": ["AM1", "SHARED1"], "Caenorhabditis japonica": ["CJA19617", "CJA37862"]}
+
+    copy = ensembl_id_db.connect(str(tmp_path / "copy.db"))
+    ensembl_id_db.import_ids(copy, "foo", ensembl_scraper.parse_output(io.StringIO(exported)))
+    assert ensembl_id_db.export_ids(copy) == ensembl_id_db.export_ids(conn, ["foo"])
+    copy.close()
+
+    assert set(ensembl_id_db.export_ids(conn)) == {"Apis mellifera", "Caenorhabditis japonica", "Nasonia vitripennis"}
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+import requests
+
+import ensembl_pipeline
+import ps_scan_py3
+
+PIPELINE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ensembl_pipeline.py")
+PROTEIN = "MKVLAAGIVGLLLA"
+CDNA = "ATGAAAGTACTAGCAGCAGGAATCGTAGGTCTACTACTAGCATAA"
+
+
+def ensembl_routes(num_species, genes_per_species, sequence_status=200, failing_types=("protein", "cdna")):
+    species = {"species": [{"name": "sp%s" % i, "display_name": "Species %s" % i} for i in range(num_species)]}
+
+    def xrefs(path, query, body):
+        species_name = path.split("/")[3]
+        return 200, [{"id": "%sG%s" % (species_name, j), "type": "gene"} for j in range(genes_per_species)]
+
+    def sequences(path, query, body):
+        seq_type = "protein" if "type=protein" in query else "cdna"
+        if sequence_status != 200 and seq_type in failing_types:
+            return sequence_status, {"error": "Internal server error"}
+        return 200, [{"query": gene_id, "id": "%s_%s" % (gene_id, seq_type), "seq": PROTEIN if seq_type == "protein"
+                      else CDNA} for gene_id in json.loads(body.decode())["ids"]]
+
+    return {("GET", "/info/species"): lambda *args: (200, species),
+            ("GET", "/xrefs/symbol/"): xrefs,
+            ("POST", "/sequence/id"): sequences}
+
+
+def prosite_routes(status=lambda: (200, "FINISHED")):
+    jobs = []
+
+    def run(path, query, body):
+        jobs.append(body)
+        return 200, "job-%s" % len(jobs)
+
+    result_types = "<types><type><identifier>out</identifier><fileSuffix>txt</fileSuffix></type></types>"
+    return {("POST", "/ps/run/"): run,
+            ("GET", "/ps/status/"): lambda *args: status(),
+            ("GET", "/ps/resulttypes/"): lambda *args: (200, result_types),
+            ("GET", "/ps/result/"): lambda path, query, body: (200, "motifs for %s" % path.split("/")[3])}
+
+
+def run(coroutine, timeout=30):
+    return asyncio.run(asyncio.wait_for(coroutine, timeout))
+
+
+def pipeline(server, tmp_path, **kwargs):
+    return ensembl_pipeline.run_pipeline("foo", str(tmp_path), "rest", server, server, email="a@b.c",
+                                         scan_server="%s/ps" % server, poll_interval=0.01, **kwargs)
+
+
+def test_pipeline_end_to_end(stub_server, tmp_path, capsys):
+    routes = ensembl_routes(3, 4)
+    routes.update(prosite_routes())
+    server, calls = stub_server(routes)
+
+    stats = run(pipeline(server, tmp_path, queue_size=2, scan_workers=2))
+    assert [(stage.name, stage.items) for stage in stats] == [("scrape", 12), ("fetch_protein", 12), ("scan", 12),
+                                                                ("fetch_cdna", 12), ("score", 12)]
+    for stage in stats:
+        assert stage.start is not None and stage.end >= stage.start
+
+    outputs = os.listdir(str(tmp_path))
+    assert len([name for name in outputs if name.endswith(".siRNA.csv")]) == 12
+    assert len([name for name in outputs if name.endswith("_protein.out.txt")]) == 12
+    with open(str(tmp_path / "sp0G0_cdna.siRNA.csv")) as ifile:
+        assert ifile.readline().startswith("Score:,9,,8")
+    with open(str(tmp_path / "sp2G3_protein.out.txt")) as ifile:
+        assert ifile.read().startswith("motifs for job-")
+    with open(str(tmp_path / "ensemble_ids.txt")) as ifile:
+        assert ifile.read().startswith("Species 0\nsp0G0\nsp0G1\nsp0G2\nsp0G3\n\nSpecies 1\n")
+    # Neither the scraper nor ps_scan_py3 should write progress messages into the pipeline's output
+    assert capsys.readouterr().out == ""
+
+
+def test_pipeline_without_scan(stub_server, tmp_path):
+    server, calls = stub_server(ensembl_routes(2, 2))
+    stats = run(ensembl_pipeline.run_pipeline("foo", str(tmp_path), "rest", server, server, scan=False))
+    assert [(stage.name, stage.items) for stage in stats] == [("scrape", 4), ("fetch_cdna", 4), ("score", 4)]
+    assert not [call for call in calls if "type=protein" in call[1]]
+
+
+def test_failing_fetch_raises(stub_server, tmp_path):
+    routes = ensembl_routes(5, 100, sequence_status=500)
+    routes.update(prosite_routes())
+    server, calls = stub_server(routes)
+    with pytest.raises(requests.HTTPError):
+        run(pipeline(server, tmp_path, queue_size=2))
+
+
+def test_failing_scan_raises(stub_server, tmp_path):
+    routes = ensembl_routes(2, 10)
+    routes.update(prosite_routes(status=lambda: (500, "Job lookup failed")))
+    server, calls = stub_server(routes)
+    with pytest.raises(ps_scan_py3.ServiceError):
+        run(pipeline(server, tmp_path, queue_size=2))
+
+
+def test_failing_stage_stops_running_scans(stub_server, tmp_path):
+    # The PROSITE jobs never finish, so the pipeline can only return if the cDNA failure cancels the scans. The cDNA
+    # fetch is held back until a scan is being polled, so the failure always lands while scans are RUNNING.
+    scanning = threading.Event()
+    routes = ensembl_routes(2, 10, sequence_status=500, failing_types=("cdna",))
+    sequences = routes[("POST", "/sequence/id")]
+
+    def fetch(path, query, body):
+        if "type=cdna" in query:
+            scanning.wait(10)
+        return sequences(path, query, body)
+
+    def status():
+        scanning.set()
+        return 200, "RUNNING"
+    routes[("POST", "/sequence/id")] = fetch
+    routes.update(prosite_routes(status=status))
+    server, calls = stub_server(routes)
+    start = time.perf_counter()
+    with pytest.raises(requests.HTTPError):
+        run(pipeline(server, tmp_path, queue_size=2, scan_workers=2), timeout=10)
+    assert scanning.is_set()
+    assert time.perf_counter() - start < 5
+
+
+def test_failing_fetch_exits_cli(stub_server, tmp_path):
+    routes = ensembl_routes(5, 100, sequence_status=500)
+    routes.update(prosite_routes())
+    server, calls = stub_server(routes)
+    result = subprocess.run([sys.executable, PIPELINE, "foo", "-o", str(tmp_path), "-e", "a@b.c", "-s", server,
+                             "-r", server, "-ps", "%s/ps" % server, "-p", "0.01", "-q", "2"],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, timeout=60)
+    assert result.returncode != 0
+    assert "Pipeline failed: 500 Server Error" in result.stderr
+
+
+@pytest.mark.parametrize("cpu_count,scan_workers", [(None, 1), (1, 5)])
+def test_slow_scan_does_not_starve_scoring(stub_server, tmp_path, monkeypatch, cpu_count, scan_workers):
+    # With one CPU the default thread pool has five threads, so five RUNNING scans would fill it if they each held one
+    monkeypatch.setattr(os, "cpu_count", lambda: cpu_count)
+    release = threading.Event()
+    routes = ensembl_routes(2, 10)
+    routes.update(prosite_routes(status=lambda: (200, "FINISHED" if release.is_set() else "RUNNING")))
+    server, calls = stub_server(routes)
+
+    outcome = {}
+
+    def run_pipeline():
+        outcome["stats"] = run(pipeline(server, tmp_path, queue_size=2, scan_workers=scan_workers))
+    thread = threading.Thread(target=run_pipeline)
+    thread.start()
+    try:
+        deadline = time.time() + 20
+        while time.time() < deadline:
+            if len([name for name in os.listdir(str(tmp_path)) if name.endswith(".siRNA.csv")]) == 20:
+                break
+            time.sleep(0.05)
+        outputs = os.listdir(str(tmp_path))
+        assert len([name for name in outputs if name.endswith(".siRNA.csv")]) == 20
+        assert not [name for name in outputs if name.endswith(".out.txt")]
+    finally:
+        release.set()
+        thread.join(30)
+    assert dict((stage.name, stage.items) for stage in outcome["stats"])["scan"] == 20
+
+
+def test_fetch_keeps_species_of_shared_gene_ids(stub_server):
+    server, calls = stub_server(ensembl_routes(0, 0))
+
+    async def fetch():
+        id_queue, out_queue = asyncio.Queue(), asyncio.Queue()
+        for hit in [("Species A", "G1"), ("Species B", "G1"), ("Species B", "G2"), None]:
+            id_queue.put_nowait(hit)
+        stats = ensembl_pipeline.StageStats("fetch_cdna")
+        with requests.Session() as session:
+            await ensembl_pipeline.fetch_stage(session, server, "cdna", id_queue, out_queue, 1, stats)
+        items = []
+        while not out_queue.empty():
+            items.append(out_queue.get_nowait())
+        return items, stats
+
+    items, stats = run(fetch())
+    assert items[-1] is None
+    assert [item[:3] for item in items[:-1]] == [(["Species A", "Species B"], "G1", "G1_cdna"),
+                                                 (["Species B"], "G2", "G2_cdna")]
+    assert stats.items == 2
+    assert len([call for call in calls if call[0] == "POST"]) == 1
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import threading
+
+import pytest
+import requests
+
+import ensembl_scraper
+
+SPECIES = {"species": [{"name": "caenorhabditis_japonica", "display_name": "Caenorhabditis japonica"},
+                       {"name": "apis_mellifera", "display_name": "Apis mellifera"}]}
+
+
+def xrefs(path, query, body):
+    if path.startswith("/xrefs/symbol/caenorhabditis_japonica/"):
+        return 200, [{"id": "CJA19617", "type": "gene"}, {"id": "CJA19617.1", "type": "transcript"},
+                     {"id": "CJA37862", "type": "gene"}]
+    if path.startswith("/xrefs/symbol/apis_mellifera/"):
+        return 200, []  # Unknown symbol
+    return 400, {"error": "Can not find internal name for species"}
+
+
+def test_rest_backend(stub_server):
+    server, calls = stub_server({("GET", "/info/species"): lambda *args: (200, SPECIES),
+                                 ("GET", "/xrefs/symbol/"): xrefs})
+    hits = list(ensembl_scraper.rest_backend("foo", server))
+    assert hits == [("Caenorhabditis japonica", "CJA19617"), ("Caenorhabditis japonica", "CJA37862")]
+    assert len(calls) == 3
+
+
+def test_rest_backend_species_filter(stub_server):
+    server, calls = stub_server({("GET", "/info/species"): lambda *args: (200, SPECIES),
+                                 ("GET", "/xrefs/symbol/"): xrefs})
+    assert list(ensembl_scraper.rest_backend("foo", server, ["Apis mellifera"])) == []
+    xref_calls = [call[1] for call in calls if "/xrefs/" in call[1]]
+    assert xref_calls == ["/xrefs/symbol/apis_mellifera/foo?object_type=gene"]
+
+
+def test_rest_backend_bad_species_raises(stub_server):
+    species = {"species": [{"name": "not_a_species", "display_name": "Not a species"}]}
+    server, calls = stub_server({("GET", "/info/species"): lambda *args: (200, species),
+                                 ("GET", "/xrefs/symbol/"): xrefs})
+    with pytest.raises(requests.HTTPError):
+        list(ensembl_scraper.rest_backend("foo", server))
+
+
+def test_rest_backend_quotes_search_term(stub_server):
+    server, calls = stub_server({("GET", "/info/species"): lambda *args: (200, SPECIES),
+                                 ("GET", "/xrefs/symbol/"): xrefs})
+    list(ensembl_scraper.rest_backend("Na+/K+ ATPase", server, ["apis_mellifera"]))
+    assert calls[-1][1] == "/xrefs/symbol/apis_mellifera/Na%2B%2FK%2B%20ATPase?object_type=gene"
+
+
+def test_rest_backend_retries_rate_limit(stub_server, monkeypatch):
+    monkeypatch.setattr(ensembl_scraper.time, "sleep", lambda seconds: None)
+    responses = [(429, {"error": "Too many requests"}), (200, SPECIES)]
+    server, calls = stub_server({("GET", "/info/species"): lambda *args: responses.pop(0),
+                                 ("GET", "/xrefs/symbol/"): xrefs})
+    assert len(list(ensembl_scraper.rest_backend("foo", server))) == 2
+    assert [call[1] for call in calls[:2]] == ["/info/species?division=EnsemblMetazoa"] * 2
+
+
+def results_page(path, query, body):
+    rows = {"1": [("CJA19617", "Caenorhabditis japonica"), ("AM1", "Apis mellifera")],
+            "2": [("CJA37862", "Caenorhabditis japonica")]}["2" if "page=2" in query else "1"]
+    html = '<html><body><div class="paginate"><a>1</a><a>2</a><a>Next</a></div>'
+    for gene_id, species in rows:
+        html += '<div class="row"><div class="lhs">Gene ID</div><div class="rhs">%s</div></div>' % gene_id
+        html += '<div class="row"><div class="lhs">Species</div><div class="rhs">%s</div></div>' % species
+    return 200, html + "</body></html>"
+
+
+def test_html_backend(stub_server):
+    server, calls = stub_server({("GET", "/Multi/Search/Results"): results_page})
+    hits = list(ensembl_scraper.html_backend("foo bar", server))
+    assert hits == [("Caenorhabditis japonica", "CJA19617"), ("Apis mellifera", "AM1"),
+                    ("Caenorhabditis japonica", "CJA37862")]
+    assert len(calls) == 3
+    assert all("q=foo%20bar;" in call[1] for call in calls)
+
+
+def test_html_backend_species_filter(stub_server):
+    server, calls = stub_server({("GET", "/Multi/Search/Results"): results_page})
+    assert list(ensembl_scraper.html_backend("foo", server, ["Apis mellifera"])) == [("Apis mellifera", "AM1")]
+
+
+def test_rest_backend_gives_up_on_rate_limit(stub_server, monkeypatch):
+    monkeypatch.setattr(ensembl_scraper.time, "sleep", lambda seconds: None)
+    server, calls = stub_server({("GET", "/info/species"): lambda *args: (429, {"error": "Too many requests"})})
+    with pytest.raises(requests.HTTPError):
+        list(ensembl_scraper.rest_backend("foo", server))
+    assert len(calls) == ensembl_scraper.MAX_RETRIES + 1
+
+
+def test_rest_backend_queries_species_concurrently(stub_server):
+    species = {"species": [{"name": "sp%s" % i, "display_name": "Species %s" % i} for i in range(3)]}
+    barrier = threading.Barrier(3, timeout=5)
+
+    def xrefs_together(path, query, body):
+        barrier.wait()  # Only returns once all three species are being looked up at the same time
+        return 200, [{"id": "%s_gene" % path.split("/")[3], "type": "gene"}]
+
+    server, calls = stub_server({("GET", "/info/species"): lambda *args: (200, species),
+                                 ("GET", "/xrefs/symbol/"): xrefs_together})
+    assert list(ensembl_scraper.rest_backend("foo", server, workers=3)) == [
+        ("Species 0", "sp0_gene"), ("Species 1", "sp1_gene"), ("Species 2", "sp2_gene")]
@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+import startup_benchmark
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize("script", startup_benchmark.SCRIPTS)
+def test_import_skips_heavy_modules(script):
+    import_ms, heavy = startup_benchmark.import_time(script, REPO)
+    assert import_ms > 0
+    assert heavy == []